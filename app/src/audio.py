@@ -0,0 +1,38 @@
+import numpy as np
+import librosa
+import soundfile as sf
+import soxr
+import shutil
+import tempfile
+
+
+def load_wav_16k_mono(source, audio_format=None):
+    try:
+      
+      """ Load a WAV file path or file-like object, convert it to a float tensor, resample to 16 kHz single-channel audio. """
+      # Decode at the native rate; resampling below only runs when it isn't 16 kHz
+      try:
+          sound_sample,sr=sf.read(source, dtype='float32', always_2d=False)
+          if sound_sample.ndim == 2:
+              sound_sample = sound_sample.mean(axis=1, dtype=np.float32)
+      except RuntimeError:
+          # libsndfile (>=1.1, bundled with soundfile>=0.12) decodes wav/flac/ogg/mp3 in memory;
+          # anything else (e.g. m4a/webm/wma) falls back to librosa/audioread
+          if isinstance(source, str):
+              sound_sample,sr=librosa.load(source ,sr=None)
+          else:
+              # audioread only opens paths, so in-memory audio is spilled to disk
+              suffix = "." + audio_format.lower().lstrip(".") if audio_format else ""
+              source.seek(0)
+              with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+                  shutil.copyfileobj(source, tmp, length=1 << 20)
+                  tmp.flush()
+                  sound_sample,sr=librosa.load(tmp.name ,sr=None)
+
+      if sr != 16000:
+          sound_sample = soxr.resample(sound_sample, sr, 16000, quality='HQ')
+      return sound_sample
+    
+    except Exception as e:
+      print("load_wav_16k_mono")
+      return None
@@ -1,51 +1,83 @@
 import numpy as np
 import pandas as pd
-import librosa
 import os
+import threading
 
 import tensorflow as tf
 import tensorflow_hub as hub
 
+try:
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:
+    Interpreter = tf.lite.Interpreter
+
+from app.src.audio import load_wav_16k_mono
+
+# Size the intra-op pool to this worker's share of cores so multiple workers don't oversubscribe
+N_THREADS = int(os.environ.get("TF_INTRA_OP_THREADS", max(1, (os.cpu_count() or 1) // int(os.environ.get("UVICORN_WORKERS", 1)))))
+tf.config.threading.set_intra_op_parallelism_threads(N_THREADS)
+
 # Reload the model
 current_direction = os.path.dirname(os.path.abspath(__file__))
-deepfake_model = tf.saved_model.load(os.path.join(current_direction,"artifact/ann_human_or_bot"))
+tflite_model_path = os.path.join(current_direction,"artifact/ann_human_or_bot_int8.tflite")
+
+if os.path.exists(tflite_model_path):
+    # Int8 model built by app/src/quantize.py; tensors are (re)allocated in _run_model whenever the clip length changes
+    interpreter = Interpreter(model_path=tflite_model_path, num_threads=N_THREADS)
+    interpreter.allocate_tensors()
+    _input_index = interpreter.get_input_details()[0]['index']
+    _output_index = interpreter.get_output_details()[0]['index']
+    _input_len = None
+    # The interpreter is not thread-safe and requests run in parallel threads
+    _interpreter_lock = threading.Lock()
+else:
+    interpreter = None
+    deepfake_model = tf.saved_model.load(os.path.join(current_direction,"artifact/ann_human_or_bot"))
+
+    # Resolve the serving signature once and pin a single trace for 1-D float32 waveforms
+    _infer = deepfake_model.signatures['serving_default']
+
+    @tf.function(input_signature=[tf.TensorSpec([None], tf.float32)])
+    def _predict(waveform):
+        return _infer(waveform)['output_0']
 
 
-def load_wav_16k_mono(filename):
-    try:
-      
-      """ Load a WAV file, convert it to a float tensor, resample to 16 kHz single-channel audio. """
-      sound_sample,sr=librosa.load(filename ,sr=16000)
-      return sound_sample
-    
-    except Exception as e:
-      print("load_wav_16k_mono")
-      return None
+def _run_model(waveform):
+    """ Run one 16 kHz mono waveform through whichever model backend is loaded. """
+    global _input_len
+    if interpreter is None:
+        return _predict(tf.constant(waveform, dtype=tf.float32))
 
-    
+    with _interpreter_lock:
+        # The waveform input is variable length; only reallocate when the length changes
+        if _input_len != len(waveform):
+            interpreter.resize_tensor_input(_input_index, [len(waveform)])
+            interpreter.allocate_tensors()
+            _input_len = len(waveform)
+        interpreter.set_tensor(_input_index, np.asarray(waveform, dtype=np.float32))
+        interpreter.invoke()
+        return interpreter.get_tensor(_output_index)
 
-def infa_deepfake(audio_path):
+
+def infa_deepfake_warmup():
+    """ Run one second of silence through the model so kernels are built before the first request. """
+    _run_model(np.zeros(16000, dtype=np.float32))
+
+
+def infa_deepfake(audio_source, audio_format=None):
   try:
-      testing_wav_data = load_wav_16k_mono(audio_path)
+      testing_wav_data = load_wav_16k_mono(audio_source, audio_format)
 
       # Reload the model
       #reloaded_model = tf.saved_model.load(model_path)
 
-      # If it's a saved model, access the signature
-      infer = deepfake_model.signatures['serving_default']
-
-      # Now use the model for prediction, passing in the necessary inputs (e.g., audio data)
-      # Make sure 'testing_wav_data' is prepared in the required shape/format
-      input_tensor = tf.convert_to_tensor(testing_wav_data, dtype=tf.float32)
-
       # Get the prediction output
-      output = infer(input_tensor)
-      predictions = output['output_0']  # Adjust 'output_0' based on your model's output signature
+      predictions = _run_model(testing_wav_data)
 
       #print(predictions)
-      my_classes=['FAKE', 'REAL']
-
-      human_bot = my_classes[tf.math.argmax(predictions)]
+      # Two classes (FAKE, REAL): compare the scores on host instead of a TF argmax
+      p = np.asarray(predictions)
+      human_bot = "REAL" if p[..., 1] > p[..., 0] else "FAKE"
       #print(f'The main sound is: {human_bot}')
       status=1
       return status,human_bot
@@ -0,0 +1,48 @@
+""" Offline int8 post-training quantization of the SavedModel into a TFLite model.
+
+Usage: python -m app.src.quantize <dir with representative audio clips>
+
+Writes artifact/ann_human_or_bot_int8.tflite, which deepfake.py serves in
+place of the SavedModel when it exists.
+"""
+import os
+import sys
+
+import tensorflow as tf
+
+# Imported from audio rather than deepfake, which loads the model and sizes TF's thread pool on import
+from app.src.audio import load_wav_16k_mono
+
+current_direction = os.path.dirname(os.path.abspath(__file__))
+saved_model_path = os.path.join(current_direction,"artifact/ann_human_or_bot")
+tflite_model_path = os.path.join(current_direction,"artifact/ann_human_or_bot_int8.tflite")
+
+
+def representative_dataset(audio_dir, limit=200):
+    """ Yield calibration waveforms for activation range estimation. """
+    names = sorted(os.listdir(audio_dir))[:limit]
+    for name in names:
+        waveform = load_wav_16k_mono(os.path.join(audio_dir, name))
+        if waveform is not None:
+            yield [waveform.astype("float32")]
+
+
+def convert(audio_dir):
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_path)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = lambda: representative_dataset(audio_dir)
+    # Conv/dense layers go int8; the STFT/log-mel front end has no int8 kernels and stays float
+    converter.target_spec.supported_ops = [
+        tf.lite.OpsSet.TFLITE_BUILTINS_INT8,
+        tf.lite.OpsSet.TFLITE_BUILTINS,
+    ]
+
+    with open(tflite_model_path, "wb") as f:
+        f.write(converter.convert())
+    print(f"Wrote {tflite_model_path}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m app.src.quantize <audio_dir>")
+    convert(sys.argv[1])
@@ -0,0 +1,21 @@
+# gunicorn -c gunicorn.conf.py app.app:app
+import os
+
+# This file runs in the master before the fork, so the heavy libraries are imported
+# once here and workers start with them already in sys.modules. That saves import
+# time per worker, not memory: CPython refcounting dirties the shared object pages,
+# and the model itself is still loaded in each worker (TF's thread pools don't
+# survive fork), so model weights are not shared.
+import librosa, soundfile, soxr, tensorflow, tensorflow_hub  # noqa: E401, F401
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+# Same variable main.py and deepfake.py's thread split use; an explicit value also
+# stops gunicorn from picking up a buildpack-set WEB_CONCURRENCY
+workers = int(os.environ.get("UVICORN_WORKERS", 1))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Workers load the SavedModel and run the warmup during startup, before their first
+# heartbeat; the 30 s default can kill and respawn them on a slow box
+timeout = 120
+
+preload_app = True
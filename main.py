@@ -6,5 +6,8 @@ if __name__ == "__main__":
         "app.app:app",
         host="0.0.0.0",
         port=int(os.environ.get("PORT", 8000)),
+        # Each worker loads its own model; opt into more with UVICORN_WORKERS.
+        # (Not WEB_CONCURRENCY: PaaS buildpacks set that from the dyno size.)
+        workers=int(os.environ.get("UVICORN_WORKERS", 1)),
         reload=False  # Disable reload in production
     )